@@ -1,20 +1,40 @@
 import os
+import json
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from pipeline import WarmConnectorRAG
+from typing import List, Dict, Any, Optional, Literal
+from pipeline import WarmConnectorRAG, EXECUTOR
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging handlers are configured in pipeline.py
 logger = logging.getLogger(__name__)
 
+# Initialize RAG pipeline
+rag_pipeline = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the RAG pipeline once per worker process."""
+    global rag_pipeline
+    try:
+        logger.info("Initializing Haystack RAG pipeline...")
+        rag_pipeline = WarmConnectorRAG()
+        logger.info("RAG pipeline initialized successfully")
+    except Exception as e:
+        logger.error("Failed to initialize RAG pipeline: %s", e)
+        raise
+    yield
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
 app = FastAPI(
     title="WarmConnector Haystack RAG API",
     description="Professional networking intelligence powered by Haystack RAG pipeline",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -26,21 +46,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG pipeline
-rag_pipeline = None
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the RAG pipeline on startup."""
-    global rag_pipeline
-    try:
-        logger.info("Initializing Haystack RAG pipeline...")
-        rag_pipeline = WarmConnectorRAG()
-        logger.info("RAG pipeline initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize RAG pipeline: {e}")
-        raise
-
 # Pydantic models
 class DocumentInput(BaseModel):
     content: str
@@ -49,11 +54,16 @@ class DocumentInput(BaseModel):
 class QueryInput(BaseModel):
     question: str
 
+class NetworkingQuery(BaseModel):
+    question: str
+    kind: Literal["analyze", "intro", "strategy", "raw"] = "raw"
+
 class QueryResponse(BaseModel):
     question: str
     answer: str
     retrieved_documents: List[Dict[str, Any]]
     success: bool
+    cached: bool = False
     error: Optional[str] = None
 
 class DocumentsInput(BaseModel):
@@ -65,6 +75,45 @@ class StatsResponse(BaseModel):
     embedding_model: str
     llm_model: str
 
+# Prompt templates for the networking endpoints, keyed by NetworkingQuery.kind
+TEMPLATES: Dict[str, str] = {
+    "analyze": """
+    As a professional networking expert, analyze this query and provide strategic insights:
+    
+    {q}
+    
+    Please provide:
+    1. Key networking opportunities or challenges identified
+    2. Specific actionable recommendations
+    3. Best practices that apply to this situation
+    4. Potential risks or considerations to keep in mind
+    """,
+    "intro": """
+    Help me with this professional introduction scenario:
+    
+    {q}
+    
+    Please provide:
+    1. A template or structure for the introduction
+    2. Key elements to include in the message
+    3. Tips for making the introduction successful
+    4. Follow-up recommendations
+    """,
+    "strategy": """
+    Provide strategic networking advice for this situation:
+    
+    {q}
+    
+    Please include:
+    1. Strategic approach and methodology
+    2. Specific tactics and techniques
+    3. Timeline and milestones
+    4. Success metrics to track
+    5. Common pitfalls to avoid
+    """,
+    "raw": "{q}",
+}
+
 # API endpoints
 @app.get("/", summary="Health check")
 async def root():
@@ -85,7 +134,7 @@ async def get_stats():
         stats = rag_pipeline.get_stats()
         return StatsResponse(**stats)
     except Exception as e:
-        logger.error(f"Error getting stats: {e}")
+        logger.error("Error getting stats: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/query", response_model=QueryResponse, summary="Query the RAG pipeline")
@@ -94,21 +143,23 @@ async def query_rag(query: QueryInput):
     Query the RAG pipeline with a networking-related question.
     Returns an AI-generated answer based on the indexed documents.
     """
+    return await networking_query(NetworkingQuery(question=query.question, kind="raw"))
+
+@app.post("/query/stream", summary="Stream an answer from the RAG pipeline")
+async def query_rag_stream(query: QueryInput):
+    """
+    Query the RAG pipeline and stream the answer as server-sent events.
+    Each event carries one JSON-encoded token; the stream ends with [DONE].
+    """
     if not rag_pipeline:
         raise HTTPException(status_code=503, detail="RAG pipeline not initialized")
     
-    try:
-        result = rag_pipeline.query(query.question)
-        return QueryResponse(**result)
-    except Exception as e:
-        logger.error(f"Error processing query: {e}")
-        return QueryResponse(
-            question=query.question,
-            answer=f"Error processing query: {str(e)}",
-            retrieved_documents=[],
-            success=False,
-            error=str(e)
-        )
+    async def token_gen():
+        async for token in rag_pipeline.astream(query.question):
+            yield f"data: {json.dumps(token)}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(token_gen(), media_type="text/event-stream")
 
 @app.post("/documents/add", summary="Add documents to the knowledge base")
 async def add_documents(documents_input: DocumentsInput):
@@ -125,113 +176,60 @@ async def add_documents(documents_input: DocumentsInput):
             for doc in documents_input.documents
         ]
         
-        result = rag_pipeline.add_documents(haystack_docs)
+        result = await rag_pipeline.aadd_documents(haystack_docs)
         return result
     except Exception as e:
-        logger.error(f"Error adding documents: {e}")
+        logger.error("Error adding documents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/networking/analyze", summary="Analyze networking content")
-async def analyze_networking_content(query: QueryInput):
+@app.post("/networking", response_model=QueryResponse, summary="Query the RAG pipeline with a networking template")
+async def networking_query(query: NetworkingQuery):
     """
-    Analyze networking-related content and provide strategic insights.
-    Specialized endpoint for networking intelligence.
+    Wrap the question in the prompt template for the requested kind
+    (analyze, intro, strategy or raw) and query the RAG pipeline.
     """
     if not rag_pipeline:
         raise HTTPException(status_code=503, detail="RAG pipeline not initialized")
     
-    # Enhance the question with networking context
-    enhanced_question = f"""
-    As a professional networking expert, analyze this query and provide strategic insights:
-    
-    {query.question}
-    
-    Please provide:
-    1. Key networking opportunities or challenges identified
-    2. Specific actionable recommendations
-    3. Best practices that apply to this situation
-    4. Potential risks or considerations to keep in mind
-    """
-    
     try:
-        result = rag_pipeline.query(enhanced_question)
-        return QueryResponse(**result)
+        # The pipeline already returns the QueryResponse shape; FastAPI serializes
+        # it through the response_model
+        return await rag_pipeline.aquery(
+            query.question,
+            kind=query.kind,
+            prompt=TEMPLATES[query.kind].format(q=query.question)
+        )
     except Exception as e:
-        logger.error(f"Error analyzing networking content: {e}")
+        logger.error("Error processing %s query: %s", query.kind, e)
         return QueryResponse(
             question=query.question,
-            answer=f"Error analyzing content: {str(e)}",
+            answer=f"Error processing query: {str(e)}",
             retrieved_documents=[],
             success=False,
             error=str(e)
         )
 
-@app.post("/networking/introduction-help", summary="Get help with introductions")
+@app.post("/networking/analyze", response_model=QueryResponse, summary="Analyze networking content")
+async def analyze_networking_content(query: QueryInput):
+    """
+    Analyze networking-related content and provide strategic insights.
+    Specialized endpoint for networking intelligence.
+    """
+    return await networking_query(NetworkingQuery(question=query.question, kind="analyze"))
+
+@app.post("/networking/introduction-help", response_model=QueryResponse, summary="Get help with introductions")
 async def introduction_help(query: QueryInput):
     """
     Get specialized help with making professional introductions.
     """
-    if not rag_pipeline:
-        raise HTTPException(status_code=503, detail="RAG pipeline not initialized")
-    
-    enhanced_question = f"""
-    Help me with this professional introduction scenario:
-    
-    {query.question}
-    
-    Please provide:
-    1. A template or structure for the introduction
-    2. Key elements to include in the message
-    3. Tips for making the introduction successful
-    4. Follow-up recommendations
-    """
-    
-    try:
-        result = rag_pipeline.query(enhanced_question)
-        return QueryResponse(**result)
-    except Exception as e:
-        logger.error(f"Error with introduction help: {e}")
-        return QueryResponse(
-            question=query.question,
-            answer=f"Error providing introduction help: {str(e)}",
-            retrieved_documents=[],
-            success=False,
-            error=str(e)
-        )
+    return await networking_query(NetworkingQuery(question=query.question, kind="intro"))
 
-@app.post("/networking/strategy", summary="Get networking strategy advice")
+@app.post("/networking/strategy", response_model=QueryResponse, summary="Get networking strategy advice")
 async def networking_strategy(query: QueryInput):
     """
     Get strategic networking advice based on the knowledge base.
     """
-    if not rag_pipeline:
-        raise HTTPException(status_code=503, detail="RAG pipeline not initialized")
-    
-    enhanced_question = f"""
-    Provide strategic networking advice for this situation:
-    
-    {query.question}
-    
-    Please include:
-    1. Strategic approach and methodology
-    2. Specific tactics and techniques
-    3. Timeline and milestones
-    4. Success metrics to track
-    5. Common pitfalls to avoid
-    """
-    
-    try:
-        result = rag_pipeline.query(enhanced_question)
-        return QueryResponse(**result)
-    except Exception as e:
-        logger.error(f"Error providing networking strategy: {e}")
-        return QueryResponse(
-            question=query.question,
-            answer=f"Error providing strategy advice: {str(e)}",
-            retrieved_documents=[],
-            success=False,
-            error=str(e)
-        )
+    return await networking_query(NetworkingQuery(question=query.question, kind="strategy"))
 
 @app.get("/health", summary="Detailed health check")
 async def health_check():
@@ -257,13 +255,31 @@ if __name__ == "__main__":
     # Run the FastAPI server
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
+    # DEV=1 enables auto-reload, which uvicorn only supports with a single worker
+    dev = os.getenv("DEV") == "1"
+    # Each worker builds its own WarmConnectorRAG with an in-memory document store, so
+    # documents added through /documents/add are only visible to the worker that handled
+    # the request. Keep the default at one worker; WEB_CONCURRENCY > 1 is only safe for
+    # read-only deployments that never add documents at runtime
+    workers = 1 if dev else int(os.getenv("WEB_CONCURRENCY", "1"))
+    limit_concurrency = os.getenv("LIMIT_CONCURRENCY")
+    # uvloop has no Windows build; let uvicorn pick the asyncio loop there
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "auto"
     
-    print(f"🚀 Starting WarmConnector Haystack RAG API on {host}:{port}")
+    print(f"🚀 Starting WarmConnector Haystack RAG API on {host}:{port} ({workers} worker(s))")
+    if workers > 1:
+        print("⚠️  Documents added via /documents/add are not shared between workers")
     print("📚 Available endpoints:")
     print("  - GET  /           : Health check")
     print("  - GET  /stats      : Pipeline statistics")
     print("  - POST /query      : Query the RAG pipeline")
+    print("  - POST /query/stream : Stream an answer as server-sent events")
     print("  - POST /documents/add : Add documents to knowledge base")
+    print("  - POST /networking : Query with a networking template (kind: analyze/intro/strategy/raw)")
     print("  - POST /networking/analyze : Analyze networking content")
     print("  - POST /networking/introduction-help : Get introduction help")
     print("  - POST /networking/strategy : Get networking strategy advice")
@@ -275,6 +291,10 @@ if __name__ == "__main__":
         "haystack_api:app",
         host=host,
         port=port,
-        reload=True,
+        workers=workers,
+        loop=loop,
+        http="httptools",
+        reload=dev,
+        limit_concurrency=int(limit_concurrency) if limit_concurrency else None,
         log_level="info"
     )
\ No newline at end of file
@@ -1,33 +1,637 @@
 import os
+import asyncio
+import contextvars
+import hashlib
+import atexit
+import json
 import logging
-from typing import List, Dict, Any
+import pathlib
+import queue
+import random
+import sqlite3
+import threading
+from dataclasses import replace
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable, Set
+import diskcache
+import numpy as np
 from dotenv import load_dotenv
 
+# Haystack is required: the components below subclass and decorate its classes
+from haystack import Document, Pipeline, component
+from haystack.dataclasses import StreamingChunk
+from haystack.utils import Secret
+from haystack.components.retrievers.in_memory import InMemoryBM25Retriever
+from haystack.components.generators import OpenAIGenerator
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+from haystack.components.writers import DocumentWriter
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    # Without FAISS the retriever falls back to an exact inner-product scan
+    FAISS_AVAILABLE = False
+
 try:
-    from haystack import Document, Pipeline
-    from haystack.components.retrievers.in_memory import InMemoryBM25Retriever
-    from haystack.components.generators import OpenAIGenerator
-    from haystack.components.builders import PromptBuilder
-    from haystack.document_stores.in_memory import InMemoryDocumentStore
-    from haystack.components.writers import DocumentWriter
-    from haystack.components.embedders import SentenceTransformersDocumentEmbedder, SentenceTransformersTextEmbedder
-    from haystack.components.retrievers import InMemoryEmbeddingRetriever
-    HAYSTACK_AVAILABLE = True
-    print("Haystack AI components loaded successfully")
-except ImportError as e:
-    # Fallback imports for when Haystack components are not available
-    HAYSTACK_AVAILABLE = False
-    print(f"Haystack import failed: {e}")
-    import json
-    import openai
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    # Without ONNX Runtime the encoder is the PyTorch SentenceTransformer model
+    ONNX_AVAILABLE = False
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Records are written by a background listener thread so
+# callers never block on stderr.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Fraction of queries logged at INFO level
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "0.01"))
+
+def log_query(question: str) -> None:
+    """Log a sampled, truncated copy of an incoming question."""
+    if random.random() < QUERY_LOG_SAMPLE_RATE:
+        logger.info("Processing query: %s", question[:80])
+
+# Bounded worker pool for blocking embedding / retrieval / LLM calls
+EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_WORKER_THREADS", "8")))
+
+async def run_in_executor(func, *args):
+    """Run a blocking call on the shared worker pool, preserving context variables."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(EXECUTOR, ctx.run, func, *args)
+
+# Per-request sink for streamed LLM tokens: (event loop, queue)
+_token_sink: contextvars.ContextVar[Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = \
+    contextvars.ContextVar("token_sink", default=None)
+
+# Precomputed embeddings for the built-in sample documents
+_EMB_CACHE = pathlib.Path(__file__).with_name(".sample_embeddings.npz")
+
+# Query embedding cache / micro-batching settings
+EMBEDDING_DIM = 384
+EMBEDDING_CACHE_SIZE = 1024
+EMBED_MAX_BATCH_SIZE = 32
+EMBED_MAX_QUEUE_TIME = 0.008
+
+class LRUCache:
+    """Thread-safe least-recently-used cache."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class QueryEmbedBatcher:
+    """
+    Batches concurrent question embeddings into one encoder forward pass.
+    A batch is flushed when it reaches max_batch_size or max_queue_time seconds
+    after its first question arrived.
+    """
+    
+    def __init__(self, encoder: Any, normalize_embeddings: bool = False,
+                 max_batch_size: int = EMBED_MAX_BATCH_SIZE, max_queue_time: float = EMBED_MAX_QUEUE_TIME):
+        # SentenceTransformer or OnnxMiniLM; both expose encode()
+        self.encoder = encoder
+        self.normalize_embeddings = normalize_embeddings
+        self.max_batch_size = max_batch_size
+        self.max_queue_time = max_queue_time
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks; hold in-flight batches here
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def process(self, text: str) -> List[float]:
+        """Submit one question and wait for its embedding from the batch it lands in."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_queue_time, self._flush)
+        return await future
+    
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self.encoder.encode(
+            texts,
+            batch_size=len(texts),
+            show_progress_bar=False,
+            normalize_embeddings=self.normalize_embeddings,
+            convert_to_numpy=True
+        )
+        return embeddings.tolist()
+    
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await run_in_executor(self._encode, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+# ONNX Runtime embedding settings. The encoder needs onnxruntime and transformers,
+# installed separately (not a project extra: this project's uv sources pin transformers
+# to the PyTorch CPU index). Export and quantize the model once with:
+#   optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 minilm_onnx/
+#   optimum-cli onnxruntime quantize --avx512_vnni --onnx_model minilm_onnx -o minilm_int8/
+ONNX_MODEL_DIR = pathlib.Path(os.getenv("MINILM_ONNX_DIR", str(pathlib.Path(__file__).with_name("minilm_int8"))))
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "4"))
+ONNX_MAX_SEQ_LENGTH = 256
+
+class OnnxMiniLM:
+    """
+    MiniLM sentence encoder running an (int8-quantized) ONNX export under ONNX Runtime.
+    encode() mirrors SentenceTransformer.encode: mean-pooled float32 embeddings.
+    """
+    
+    def __init__(self, model_dir: pathlib.Path, intra_op_num_threads: int = ONNX_INTRA_OP_THREADS):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_path = next(
+            (model_dir / name for name in ("model_quantized.onnx", "model.onnx") if (model_dir / name).exists()),
+            None
+        )
+        if model_path is None:
+            raise FileNotFoundError(f"No ONNX model found in {model_dir}")
+        self.name = str(model_path)
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+        # `optimum-cli onnxruntime quantize` writes only the model and its config, so
+        # fall back to the original model's tokenizer when the export dir lacks one
+        has_tokenizer = any((model_dir / name).exists() for name in ("tokenizer.json", "tokenizer_config.json"))
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir) if has_tokenizer else EMBEDDING_MODEL)
+        self._input_names = {node.name for node in self.session.get_inputs()}
+    
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False,
+               **kwargs) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                     max_length=ONNX_MAX_SEQ_LENGTH, return_tensors="np")
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if normalize_embeddings:
+                embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            batches.append(embeddings.astype(np.float32))
+        return np.vstack(batches) if batches else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = 64
+
+# Process-wide sentence encoder shared by every embedder, see get_encoder()
+_MODEL: Optional[Any] = None
+_MODEL_LOCK = threading.Lock()
+
+def get_encoder() -> Any:
+    """
+    Load the sentence encoder once per process: the int8 ONNX export when present,
+    otherwise the PyTorch SentenceTransformer (fp16 on GPU).
+    """
+    global _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None and ONNX_AVAILABLE and ONNX_MODEL_DIR.exists():
+            try:
+                _MODEL = OnnxMiniLM(ONNX_MODEL_DIR)
+            except Exception as e:
+                logger.warning("Could not load ONNX encoder from %s, using SentenceTransformer: %s",
+                               ONNX_MODEL_DIR, e)
+        if _MODEL is None:
+            if SENTENCE_TRANSFORMERS_AVAILABLE:
+                model = SentenceTransformer(EMBEDDING_MODEL)
+                model.eval()
+                if model.device.type == "cuda":
+                    # fp16 roughly doubles MiniLM throughput on GPU
+                    model.half()
+                _MODEL = model
+            else:
+                raise ImportError("Embedding requires sentence-transformers or onnxruntime with an ONNX export")
+        return _MODEL
+
+def encoder_name(encoder: Any) -> str:
+    """Identify the weights behind an encoder, for cache keys."""
+    return getattr(encoder, "name", EMBEDDING_MODEL)
+
+@component
+class SharedTextEmbedder:
+    """Query embedder over a shared encoder (SentenceTransformer or OnnxMiniLM)."""
+    
+    def __init__(self, encoder: Any, normalize_embeddings: bool = True):
+        self.encoder = encoder
+        self.model = encoder_name(encoder)
+        self.normalize_embeddings = normalize_embeddings
+    
+    def warm_up(self):
+        pass
+    
+    @component.output_types(embedding=List[float])
+    def run(self, text: str):
+        embedding = self.encoder.encode([text], show_progress_bar=False, convert_to_numpy=True,
+                                        normalize_embeddings=self.normalize_embeddings)[0]
+        return {"embedding": embedding.tolist()}
+
+@component
+class SharedDocEmbedder:
+    """Document embedder over a shared encoder (SentenceTransformer or OnnxMiniLM)."""
+    
+    def __init__(self, encoder: Any, batch_size: int = EMBED_BATCH_SIZE, normalize_embeddings: bool = True):
+        self.encoder = encoder
+        self.model = encoder_name(encoder)
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+    
+    def warm_up(self):
+        pass
+    
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        embeddings = self.encoder.encode([doc.content or "" for doc in documents], batch_size=self.batch_size,
+                                         show_progress_bar=False, convert_to_numpy=True,
+                                         normalize_embeddings=self.normalize_embeddings)
+        for doc, embedding in zip(documents, embeddings):
+            doc.embedding = embedding.tolist()
+        return {"documents": documents}
+
+# Questions run through the pipeline (minus the LLM) at startup
+WARMUP_QUERIES = ("networking", "linkedin introduction", "email template")
+
+# Semantic cache settings
+SEMANTIC_CACHE_THRESHOLD = 0.95
+MAX_CACHE = 10_000
+
+class SemanticCache:
+    """
+    Answer cache for near-duplicate questions.
+    Stores L2-normalized query embeddings in a preallocated matrix so a lookup
+    is a single matrix-vector product; the least recently used entry is evicted
+    once the cache is full. Entries are partitioned by a key (the prompt kind), and
+    a lookup only matches entries stored under the same key.
+    """
+    
+    def __init__(self, dim: int = EMBEDDING_DIM, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = MAX_CACHE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vecs = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._keys = np.empty(max_entries, dtype=object)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+    
+    def lookup(self, embedding: List[float], key: str = "") -> Optional[Dict[str, Any]]:
+        """Return the cached entry under key most similar to the embedding, if close enough."""
+        vec = self._normalize(embedding)
+        with self._lock:
+            if self._size == 0:
+                return None
+            sims = np.where(self._keys[:self._size] == key, self._vecs[:self._size] @ vec, -np.inf)
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._entries[best]
+    
+    def add(self, embedding: List[float], entry: Dict[str, Any], key: str = "") -> None:
+        """Store an entry under key, evicting the least recently used one when full."""
+        vec = self._normalize(embedding)
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+            self._clock += 1
+            self._vecs[slot] = vec
+            self._entries[slot] = entry
+            self._keys[slot] = key
+            self._last_used[slot] = self._clock
+    
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries = [None] * self.max_entries
+            self._keys[:] = None
+            self._last_used[:] = 0
+            self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+
+# RAG prompt, split around the per-document context block. Everything but the
+# documents and the question is fixed, so str.format() is all the templating needed.
+PROMPT_PREFIX = (
+    "You are a professional networking expert assistant for WarmConnector.\n"
+    "Use the provided context to answer questions about professional networking, connections, and introductions.\n"
+    "\n"
+    "Context:\n"
+)
+PROMPT_DOC_FMT = "{c}\n"
+PROMPT_SUFFIX_FMT = (
+    "\n"
+    "Question: {q}\n"
+    "\n"
+    "Based on the context above, provide a helpful and accurate answer focused on professional networking insights.\n"
+    "If the information isn't available in the context, clearly state that and provide general networking advice.\n"
+    "\n"
+    "Answer:"
+)
+
+@component
+class RAGPromptBuilder:
+    """
+    Builds the RAG prompt by plain string formatting instead of Jinja rendering.
+    Each document contributes at most MAX_DOC_CHARS characters of context.
+    """
+    
+    @component.output_types(prompt=str)
+    def run(self, question: str, documents: Optional[List[Document]] = None):
+        context = [PROMPT_DOC_FMT.format(c=(doc.content or "").strip()[:MAX_DOC_CHARS]) for doc in documents or []]
+        return {"prompt": "".join([PROMPT_PREFIX, *context, PROMPT_SUFFIX_FMT.format(q=question)])}
+
+# LLM completion cache settings
+GEN_CACHE_DIR = pathlib.Path(__file__).with_name(".gen_cache")
+GEN_CACHE_SIZE_LIMIT = 1 << 30
+GEN_CACHE_TTL = 86400
+
+@component
+class CachedOpenAIGenerator(OpenAIGenerator):
+    """
+    OpenAIGenerator that caches completions on disk, keyed on the model,
+    generation settings, system prompt and prompt. Cache hits are not streamed.
+    """
+    
+    def __init__(self, cache: diskcache.Cache, **kwargs):
+        # @component rebuilds the class, so zero-argument super() is unavailable here
+        OpenAIGenerator.__init__(self, **kwargs)
+        self.cache = cache
+    
+    @component.output_types(replies=List[str], meta=List[Dict[str, Any]])
+    def run(self, prompt: str, system_prompt: Optional[str] = None,
+            streaming_callback: Optional[Callable[[StreamingChunk], None]] = None,
+            generation_kwargs: Optional[Dict[str, Any]] = None):
+        settings = json.dumps({**self.generation_kwargs, **(generation_kwargs or {})}, sort_keys=True)
+        system = system_prompt if system_prompt is not None else self.system_prompt
+        key = hashlib.sha256(f"{self.model}|{settings}|{system}|{prompt}".encode()).hexdigest()
+        
+        result = self.cache.get(key)
+        if result is None:
+            result = OpenAIGenerator.run(self, prompt=prompt, system_prompt=system_prompt,
+                                         streaming_callback=streaming_callback,
+                                         generation_kwargs=generation_kwargs)
+            self.cache.set(key, result, expire=GEN_CACHE_TTL)
+        return result
+
+# Sidecar store for document embeddings, keyed by content hash and model
+EMBEDDING_DB_PATH = pathlib.Path(__file__).with_name(".embeddings.sqlite")
+
+def content_id(content: str) -> str:
+    """Document id derived from content alone, so re-posted documents collapse onto one id."""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+class EmbeddingStore:
+    """SQLite map of (content hash, model) -> float32 embedding, shared across restarts."""
+    
+    def __init__(self, path: pathlib.Path = EMBEDDING_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+    
+    def get_many(self, hashes: List[str], model: str) -> Dict[str, List[float]]:
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" * len(hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, embedding FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *hashes]
+            ).fetchall()
+        return {h: np.frombuffer(blob, dtype=np.float32).tolist() for h, blob in rows}
+    
+    def put_many(self, items: List[Tuple[str, List[float]]], model: str) -> None:
+        if not items:
+            return
+        rows = [(h, model, np.asarray(embedding, dtype=np.float32).tobytes()) for h, embedding in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+# Hybrid retrieval settings
+RETRIEVAL_TOP_K = 5
+RRF_K = 60
+
+# Prompt context budget: each document is cut to MAX_DOC_CHARS in the prompt, and
+# fused results are kept only while their total fits MAX_CONTEXT_CHARS
+MAX_DOC_CHARS = 1500
+MAX_CONTEXT_CHARS = 6000
+
+# Question keywords that restrict dense retrieval to matching document types
+HINTS: Dict[str, Tuple[str, ...]] = {
+    "linkedin": ("networking_guide", "platform_guide"),
+    "email": ("communication_guide",),
+    "introduction": ("networking_strategy",),
+}
+
+def hinted_doc_types(question: str) -> Optional[List[str]]:
+    """Return the document types hinted at by the question, or None for no restriction."""
+    text = question.lower()
+    types = {doc_type for keyword, doc_types in HINTS.items() if keyword in text for doc_type in doc_types}
+    return sorted(types) or None
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], top_k: int, k: int = RRF_K) -> List[Document]:
+    """
+    Merge ranked document lists; each document scores sum(1 / (k + rank)) over the lists.
+    A fused document keeps the score the first ranking gave it, or None if the first
+    ranking did not return it, so scores from different retrievers are never mixed.
+    Its fusion score is stored in meta["rrf_score"].
+    """
+    scores: Dict[str, float] = {}
+    by_id: Dict[str, Document] = {}
+    for position, ranking in enumerate(rankings):
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (k + rank)
+            if doc.id not in by_id:
+                by_id[doc.id] = doc if position == 0 else replace(doc, score=None)
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [
+        replace(by_id[doc_id], meta={**by_id[doc_id].meta, "rrf_score": scores[doc_id]})
+        for doc_id in best
+    ]
+
+def fit_context_budget(documents: List[Document], budget: int = MAX_CONTEXT_CHARS) -> List[Document]:
+    """Keep the best-ranked documents while their (truncated) content fits the budget; always keep one."""
+    kept: List[Document] = []
+    used = 0
+    for doc in documents:
+        size = min(len(doc.content or ""), MAX_DOC_CHARS)
+        if kept and used + size > budget:
+            break
+        kept.append(doc)
+        used += size
+    return kept
+
+# HNSW index settings
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Exact-scan settings: corpora above this size get a binary (Hamming) prefilter
+# whose top_k * BINARY_RERANK_FACTOR candidates are rescored with int8 codes
+BINARY_PREFILTER_MIN_DOCS = 5000
+BINARY_RERANK_FACTOR = 10
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize each row to int8 with a per-row scale; row ~= codes * scale."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+@component
+class HNSWEmbeddingRetriever:
+    """
+    Dense retriever backed by a FAISS HNSW index over the document store's embeddings.
+    Vectors are held as 8-bit codes: FAISS uses an HNSW graph over a scalar-quantized
+    store, and the exact-scan fallback (used when FAISS is not installed) scores
+    int8 codes with per-row scales.
+    Call rebuild() after writing documents to the store.
+    """
+    
+    def __init__(self, document_store: InMemoryDocumentStore, top_k: int = 5):
+        self.document_store = document_store
+        self.top_k = top_k
+        # (documents, meta["type"] per document, int8 codes, row scales, sign bits, faiss index),
+        # swapped as a unit on rebuild
+        self._state: Tuple[List[Document], np.ndarray, np.ndarray, np.ndarray, np.ndarray, Any] = (
+            [], np.zeros(0, dtype=object), np.zeros((0, EMBEDDING_DIM), dtype=np.int8),
+            np.zeros(0, dtype=np.float32), np.zeros((0, EMBEDDING_DIM // 8), dtype=np.uint8), None
+        )
+    
+    def rebuild(self) -> None:
+        """Re-read embedded documents from the store and rebuild the index."""
+        documents = [doc for doc in self.document_store.filter_documents() if doc.embedding is not None]
+        matrix = np.asarray([doc.embedding for doc in documents], dtype=np.float32).reshape(len(documents), -1)
+        
+        index = None
+        if FAISS_AVAILABLE and documents:
+            index = faiss.IndexHNSWSQ(matrix.shape[1], faiss.ScalarQuantizer.QT_8bit, HNSW_M,
+                                      faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index.train(matrix)
+            index.add(matrix)
+        
+        codes, scales = quantize_int8(matrix)
+        bits = np.packbits(matrix > 0, axis=1)
+        doc_types = np.array([doc.meta.get("type") for doc in documents], dtype=object)
+        self._state = (documents, doc_types, codes, scales, bits, index)
+    
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], top_k: Optional[int] = None,
+            doc_types: Optional[List[str]] = None):
+        """
+        Return the top_k documents with the highest inner product to the query.
+        With doc_types, only documents whose meta["type"] is listed are scored.
+        """
+        documents, types, codes, scales, bits, index = self._state
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        if doc_types:
+            rows = np.flatnonzero(np.isin(types, doc_types))
+            top_k = min(top_k or self.top_k, len(rows))
+            if top_k == 0:
+                return {"documents": []}
+            hits = self._exact_search(query, codes[rows], scales[rows], bits[rows], top_k)
+            return {"documents": [replace(documents[rows[i]], score=score) for i, score in hits]}
+        
+        top_k = min(top_k or self.top_k, len(documents))
+        if top_k == 0:
+            return {"documents": []}
+        
+        if index is not None:
+            index.hnsw.efSearch = max(HNSW_EF_SEARCH, top_k)
+            scores, ids = index.search(query[None, :], top_k)
+            hits = [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i >= 0]
+        else:
+            hits = self._exact_search(query, codes, scales, bits, top_k)
+        
+        return {"documents": [replace(documents[i], score=score) for i, score in hits]}
+    
+    @staticmethod
+    def _exact_search(query: np.ndarray, codes: np.ndarray, scales: np.ndarray,
+                      bits: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        candidates = np.arange(len(codes))
+        if len(codes) > BINARY_PREFILTER_MIN_DOCS:
+            query_bits = np.packbits(query > 0)
+            hamming = _POPCOUNT[np.bitwise_xor(bits, query_bits)].sum(axis=1, dtype=np.int32)
+            n_candidates = top_k * BINARY_RERANK_FACTOR
+            candidates = np.argpartition(hamming, n_candidates - 1)[:n_candidates]
+        
+        scores = (codes[candidates] @ query) * scales[candidates]
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
 class WarmConnectorRAG:
     """
     Haystack RAG pipeline for WarmConnector professional networking intelligence.
@@ -41,60 +645,61 @@ class WarmConnectorRAG:
         
         # Initialize document store
         self.document_store = InMemoryDocumentStore()
+        # Serializes the duplicate check, store writes and the dense index rebuild
+        self._index_lock = threading.Lock()
+        
+        # Answers for near-duplicate questions
+        self.semantic_cache = SemanticCache()
         
         # Initialize components
         self._setup_components()
         self._setup_pipeline()
         self._load_sample_documents()
+        self._warm_up()
     
     def _setup_components(self):
         """Initialize all Haystack components for the RAG pipeline."""
         
-        # Document embedder for ingestion
-        self.doc_embedder = SentenceTransformersDocumentEmbedder(
-            model="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Both embedders (and the query batcher) share one encoder; embeddings are
+        # L2-normalized so cosine similarity is a plain dot product downstream
+        encoder = get_encoder()
+        self.doc_embedder = SharedDocEmbedder(encoder)
+        self.text_embedder = SharedTextEmbedder(encoder)
         
-        # Text embedder for queries
-        self.text_embedder = SentenceTransformersTextEmbedder(
-            model="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Question embedding cache and micro-batcher for concurrent requests. The text
+        # embedder runs outside the query pipeline so repeat questions skip it.
+        self.embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE)
+        self.embed_batcher = QueryEmbedBatcher(encoder, normalize_embeddings=self.text_embedder.normalize_embeddings)
+        
+        # Embeddings of previously indexed documents, so re-posted or restarted
+        # content skips the encoder
+        self.embedding_store = EmbeddingStore()
         
         # Document writer
         self.doc_writer = DocumentWriter(document_store=self.document_store)
         
-        # Retriever for semantic search
-        self.retriever = InMemoryEmbeddingRetriever(
+        # Retrievers for keyword and semantic search; results are merged with RRF
+        self.bm25_retriever = InMemoryBM25Retriever(
             document_store=self.document_store,
-            top_k=5
+            top_k=RETRIEVAL_TOP_K
+        )
+        self.retriever = HNSWEmbeddingRetriever(
+            document_store=self.document_store,
+            top_k=RETRIEVAL_TOP_K
         )
         
-        # OpenAI generator
-        self.generator = OpenAIGenerator(
-            api_key=self.openai_api_key,
+        # OpenAI generator, with completions cached on disk
+        self.gen_cache = diskcache.Cache(str(GEN_CACHE_DIR), size_limit=GEN_CACHE_SIZE_LIMIT)
+        self.generator = CachedOpenAIGenerator(
+            cache=self.gen_cache,
+            api_key=Secret.from_token(self.openai_api_key),
             model="gpt-3.5-turbo",
+            streaming_callback=self._on_token,
             generation_kwargs={"max_tokens": 500, "temperature": 0.3}
         )
         
         # Prompt builder for RAG
-        self.prompt_builder = PromptBuilder(
-            template="""
-            You are a professional networking expert assistant for WarmConnector.
-            Use the provided context to answer questions about professional networking, connections, and introductions.
-            
-            Context:
-            {% for document in documents %}
-                {{ document.content }}
-            {% endfor %}
-            
-            Question: {{ question }}
-            
-            Based on the context above, provide a helpful and accurate answer focused on professional networking insights.
-            If the information isn't available in the context, clearly state that and provide general networking advice.
-            
-            Answer:
-            """
-        )
+        self.prompt_builder = RAGPromptBuilder()
     
     def _setup_pipeline(self):
         """Create the indexing and querying pipelines."""
@@ -105,16 +710,13 @@ class WarmConnectorRAG:
         self.indexing_pipeline.add_component("doc_writer", self.doc_writer)
         self.indexing_pipeline.connect("doc_embedder", "doc_writer")
         
-        # Querying pipeline (RAG)
+        # Querying pipeline (RAG); retrieval runs beforehand so that keyword and
+        # dense retrievers can be fused
         self.query_pipeline = Pipeline()
-        self.query_pipeline.add_component("text_embedder", self.text_embedder)
-        self.query_pipeline.add_component("retriever", self.retriever)
         self.query_pipeline.add_component("prompt_builder", self.prompt_builder)
         self.query_pipeline.add_component("llm", self.generator)
         
         # Connect components
-        self.query_pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
-        self.query_pipeline.connect("retriever", "prompt_builder.documents")
         self.query_pipeline.connect("prompt_builder", "llm")
     
     def _load_sample_documents(self):
@@ -202,58 +804,281 @@ class WarmConnectorRAG:
                 meta={"source": "relationship_building", "type": "networking_fundamentals"}
             )
         ]
+        # Same content-hash ids as add_documents, so re-posting a sample document is skipped
+        sample_docs = [replace(doc, id=content_id(doc.content)) for doc in sample_docs]
         
-        logger.info(f"Indexing {len(sample_docs)} sample documents...")
-        
-        # Run indexing pipeline
-        self.indexing_pipeline.run({"doc_embedder": {"documents": sample_docs}})
+        docs_hash = self._sample_docs_hash(sample_docs)
+        embeddings = self._load_cached_sample_embeddings(docs_hash, len(sample_docs))
+        if embeddings is not None:
+            logger.info("Loading %s sample documents with cached embeddings", len(sample_docs))
+            self.document_store.write_documents([
+                replace(doc, embedding=embedding.tolist())
+                for doc, embedding in zip(sample_docs, embeddings)
+            ])
+        else:
+            logger.info("Indexing %s sample documents...", len(sample_docs))
+            
+            # Run indexing pipeline
+            result = self.indexing_pipeline.run(
+                {"doc_embedder": {"documents": sample_docs}},
+                include_outputs_from={"doc_embedder"}
+            )
+            embedded_docs = result["doc_embedder"]["documents"]
+            self._save_sample_embeddings(docs_hash, [doc.embedding for doc in embedded_docs])
         
+        self.retriever.rebuild()
         logger.info("Document indexing completed successfully")
     
+    def _warm_up(self):
+        """
+        Run a few common questions through embedding, retrieval and prompt building
+        (not the LLM) so the first real request doesn't pay for lazy initialization.
+        """
+        for question in WARMUP_QUERIES:
+            query_embedding = self._embed_question(question)
+            documents = self._retrieve_sync(question, query_embedding)
+            self.prompt_builder.run(question=question, documents=documents)
+        logger.info("Warm-up completed")
+    
+    def _sample_docs_hash(self, docs: List[Document]) -> str:
+        """Fingerprint the sample corpus together with the embedder settings."""
+        digest = hashlib.sha256(f"{self.doc_embedder.model}|{self.doc_embedder.normalize_embeddings}".encode())
+        for doc in docs:
+            digest.update(b"\0")
+            digest.update(doc.content.encode())
+        return digest.hexdigest()
+    
+    def _load_cached_sample_embeddings(self, docs_hash: str, count: int) -> Optional[np.ndarray]:
+        """Return the cached sample embeddings if they were built from the same corpus."""
+        if not _EMB_CACHE.exists():
+            return None
+        try:
+            with np.load(_EMB_CACHE) as cache:
+                if str(cache["hash"]) != docs_hash or len(cache["embeddings"]) != count:
+                    return None
+                return cache["embeddings"]
+        except Exception as e:
+            logger.warning("Ignoring unreadable sample embedding cache: %s", e)
+            return None
+    
+    def _save_sample_embeddings(self, docs_hash: str, embeddings: List[List[float]]) -> None:
+        try:
+            np.savez(_EMB_CACHE, embeddings=np.asarray(embeddings, dtype=np.float32), hash=docs_hash)
+        except OSError as e:
+            logger.warning("Could not write sample embedding cache: %s", e)
+    
     def add_documents(self, documents: List[Document]) -> Dict[str, Any]:
-        """Add new documents to the knowledge base."""
+        """
+        Add new documents to the knowledge base. Documents are identified by a hash of
+        their content; ones already in the store are skipped, and ones embedded before
+        (possibly by an earlier process) reuse their stored embedding.
+        """
         try:
-            result = self.indexing_pipeline.run({"doc_embedder": {"documents": documents}})
-            logger.info(f"Successfully indexed {len(documents)} new documents")
-            return {"success": True, "indexed_count": len(documents)}
+            new_docs: Dict[str, Document] = {}
+            for doc in documents:
+                doc_id = content_id(doc.content or "")
+                new_docs.setdefault(doc_id, replace(doc, id=doc_id))
+            # The existence check, the write and the rebuild run under one lock: concurrent
+            # requests with the same content would otherwise both pass the check and the
+            # second write would fail as a duplicate, and a rebuild that read the store
+            # before another request's write could install its index last
+            with self._index_lock:
+                existing = {
+                    doc.id for doc in self.document_store.filter_documents(
+                        {"field": "id", "operator": "in", "value": list(new_docs)}
+                    )
+                }
+                new = [doc for doc_id, doc in new_docs.items() if doc_id not in existing]
+                skipped_count = len(documents) - len(new)
+                
+                if new:
+                    model = self.doc_embedder.model
+                    stored = self.embedding_store.get_many([doc.id for doc in new], model)
+                    to_embed = [doc for doc in new if doc.id not in stored]
+                    if to_embed:
+                        result = self.indexing_pipeline.run(
+                            {"doc_embedder": {"documents": to_embed}},
+                            include_outputs_from={"doc_embedder"}
+                        )
+                        self.embedding_store.put_many(
+                            [(doc.id, doc.embedding) for doc in result["doc_embedder"]["documents"]], model
+                        )
+                    if stored:
+                        self.document_store.write_documents([
+                            replace(doc, embedding=stored[doc.id]) for doc in new if doc.id in stored
+                        ])
+                    self.retriever.rebuild()
+            
+            if new:
+                # Cached answers may no longer reflect the best matching documents
+                self.semantic_cache.clear()
+            
+            logger.info("Indexed %s new documents, skipped %s duplicates", len(new), skipped_count)
+            return {"success": True, "indexed_count": len(new), "skipped_count": skipped_count}
         except Exception as e:
-            logger.error(f"Error indexing documents: {e}")
+            logger.error("Error indexing documents: %s", e)
             return {"success": False, "error": str(e)}
     
-    def query(self, question: str) -> Dict[str, Any]:
-        """Query the RAG pipeline with a networking-related question."""
+    def _on_token(self, chunk: StreamingChunk) -> None:
+        """Forward a streamed token to the requesting coroutine, if it is streaming."""
+        sink = _token_sink.get()
+        if sink is not None and chunk.content:
+            loop, queue = sink
+            loop.call_soon_threadsafe(queue.put_nowait, chunk.content)
+    
+    def _embed_question(self, question: str) -> List[float]:
+        """Embed a question, reusing the cached vector for repeat questions."""
+        embedding = self.embedding_cache.get(question)
+        if embedding is None:
+            embedding = self.text_embedder.run(text=question)["embedding"]
+            self.embedding_cache.put(question, embedding)
+        return embedding
+    
+    async def _aembed_question(self, question: str) -> List[float]:
+        """Embed a question, batching with other in-flight questions on a cache miss."""
+        embedding = self.embedding_cache.get(question)
+        if embedding is None:
+            embedding = await self.embed_batcher.process(question)
+            self.embedding_cache.put(question, embedding)
+        return embedding
+    
+    async def aadd_documents(self, documents: List[Document]) -> Dict[str, Any]:
+        """Add documents without blocking the event loop."""
+        return await run_in_executor(self.add_documents, documents)
+    
+    async def aquery(self, question: str, kind: str = "raw", prompt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Query the RAG pipeline without blocking the event loop. prompt, when given, is
+        the text the LLM answers in place of the question (e.g. the question wrapped
+        in a template); kind names that template. Retrieval, document type hints and
+        the semantic cache (partitioned by kind) all work from the question itself,
+        so fixed template text cannot steer them.
+        """
+        prompt = prompt or question
         try:
-            logger.info(f"Processing query: {question}")
+            log_query(question)
             
-            result = self.query_pipeline.run({
-                "text_embedder": {"text": question},
-                "prompt_builder": {"question": question}
-            })
+            query_embedding = await self._aembed_question(question)
+            cached = self._cached_response(question, kind, query_embedding)
+            if cached is not None:
+                return cached
             
-            answer = result["llm"]["replies"][0]
-            retrieved_docs = result["retriever"]["documents"]
+            documents = await self._retrieve(question, query_embedding)
+            return await run_in_executor(self._generate, question, kind, prompt, query_embedding, documents)
+        except Exception as e:
+            logger.error("Error processing query: %s", e)
+            return self._error_response(question, e)
+    
+    async def astream(self, question: str) -> AsyncIterator[str]:
+        """
+        Query the RAG pipeline, yielding answer tokens as the LLM produces them.
+        Cached answers are yielded as a single chunk.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        token = _token_sink.set((asyncio.get_running_loop(), queue))
+        try:
+            task = asyncio.ensure_future(self.aquery(question))
+        finally:
+            _token_sink.reset(token)
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        streamed = False
+        while (chunk := await queue.get()) is not None:
+            streamed = True
+            yield chunk
+        
+        result = task.result()
+        if not streamed:
+            yield result["answer"]
+    
+    def query(self, question: str, kind: str = "raw", prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Query the RAG pipeline with a networking-related question; see aquery."""
+        prompt = prompt or question
+        try:
+            log_query(question)
             
-            return {
-                "question": question,
-                "answer": answer,
-                "retrieved_documents": [
-                    {
-                        "content": doc.content,
-                        "meta": doc.meta,
-                        "score": doc.score if hasattr(doc, 'score') else None
-                    }
-                    for doc in retrieved_docs
-                ],
-                "success": True
-            }
+            query_embedding = self._embed_question(question)
+            cached = self._cached_response(question, kind, query_embedding)
+            if cached is not None:
+                return cached
+            
+            documents = self._retrieve_sync(question, query_embedding)
+            return self._generate(question, kind, prompt, query_embedding, documents)
         except Exception as e:
-            logger.error(f"Error processing query: {e}")
-            return {
-                "question": question,
-                "answer": f"I apologize, but I encountered an error processing your question: {str(e)}",
-                "success": False,
-                "error": str(e)
-            }
+            logger.error("Error processing query: %s", e)
+            return self._error_response(question, e)
+    
+    def _retrieve_sync(self, question: str, query_embedding: List[float]) -> List[Document]:
+        """Run keyword and dense retrieval one after the other and fuse their rankings."""
+        doc_types = hinted_doc_types(question)
+        return fit_context_budget(reciprocal_rank_fusion([
+            self.retriever.run(query_embedding=query_embedding, doc_types=doc_types)["documents"],
+            self.bm25_retriever.run(query=question)["documents"]
+        ], top_k=RETRIEVAL_TOP_K))
+    
+    async def _retrieve(self, question: str, query_embedding: List[float]) -> List[Document]:
+        """
+        Run keyword and dense retrieval concurrently, fuse their rankings and trim the
+        result to the prompt context budget. Dense retrieval is pre-filtered to the
+        document types the user's question (not a template around it) hints at; keyword
+        retrieval stays unfiltered so fusion can still surface other documents.
+        Dense results are ranked first so fused documents keep their embedding similarity.
+        """
+        doc_types = hinted_doc_types(question)
+        bm25, dense = await asyncio.gather(
+            run_in_executor(lambda: self.bm25_retriever.run(query=question)),
+            run_in_executor(lambda: self.retriever.run(query_embedding=query_embedding, doc_types=doc_types))
+        )
+        return fit_context_budget(reciprocal_rank_fusion([dense["documents"], bm25["documents"]], top_k=RETRIEVAL_TOP_K))
+    
+    def _cached_response(self, question: str, kind: str, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        cached = self.semantic_cache.lookup(query_embedding, key=kind)
+        if cached is None:
+            return None
+        return {**cached, "question": question, "success": True, "cached": True, "error": None}
+    
+    def _generate(self, question: str, kind: str, prompt: str, query_embedding: List[float],
+                  documents: List[Document]) -> Dict[str, Any]:
+        """Answer the prompt from the retrieved documents and cache the result under kind."""
+        result = self.query_pipeline.run({
+            "prompt_builder": {"question": prompt, "documents": documents}
+        })
+        answer = result["llm"]["replies"][0]
+        
+        response = {
+            "question": question,
+            "answer": answer,
+            # score is the embedding similarity (None for documents only keyword retrieval
+            # found); rrf_score is the fused rank the documents are ordered by
+            "retrieved_documents": [
+                {
+                    "content": doc.content,
+                    "meta": {key: value for key, value in doc.meta.items() if key != "rrf_score"},
+                    "score": doc.score if hasattr(doc, 'score') else None,
+                    "rrf_score": doc.meta.get("rrf_score")
+                }
+                for doc in documents
+            ],
+            "success": True,
+            "cached": False,
+            "error": None
+        }
+        self.semantic_cache.add(query_embedding, {
+            "answer": answer,
+            "retrieved_documents": response["retrieved_documents"]
+        }, key=kind)
+        return response
+    
+    @staticmethod
+    def _error_response(question: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "question": question,
+            "answer": f"I apologize, but I encountered an error processing your question: {str(error)}",
+            "retrieved_documents": [],
+            "success": False,
+            "cached": False,
+            "error": str(error)
+        }
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the document store."""
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Long-lived NetworkingRAGPipeline worker behind a Unix domain socket.
+
+The pipeline is built once per process instead of once per query. Each request
+and response is a JSON document preceded by its length as a 4-byte big-endian
+unsigned integer. A request is the same object haystack_rag_pipeline.py reads
+from stdin ({"question", "context", "type"}), or a list of them.
+"""
+import os
+import sys
+import orjson
+import socket
+import struct
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from haystack_rag_pipeline import NetworkingRAGPipeline
+
+SOCKET_PATH = os.getenv("RAG_SOCKET_PATH", "/tmp/warmconnect_rag.sock")
+WORKERS = int(os.getenv("RAG_DAEMON_WORKERS", "4"))
+MAX_MESSAGE_SIZE = 16 << 20
+
+_HEADER = struct.Struct(">I")
+
+ERROR_RESPONSE = {
+    "answer": "Error processing networking query",
+    "confidence": 0.0,
+    "sources": [],
+    "insights": ["Professional networking guidance available"]
+}
+
+def handle_request(rag, query_data):
+    if isinstance(query_data, list):
+        return rag.query_batch(query_data)
+    return rag.query(
+        question=query_data.get("question", ""),
+        context=query_data.get("context", ""),
+        query_type=query_data.get("type", "networking_strategy")
+    )
+
+async def serve_client(rag, executor, reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(_HEADER.size)
+            except asyncio.IncompleteReadError:
+                break
+            (length,) = _HEADER.unpack(header)
+            if length > MAX_MESSAGE_SIZE:
+                break
+            payload = await reader.readexactly(length)
+            try:
+                result = await loop.run_in_executor(executor, handle_request, rag, orjson.loads(payload))
+            except Exception:
+                result = ERROR_RESPONSE
+            body = orjson.dumps(result)
+            writer.write(_HEADER.pack(len(body)) + body)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+def socket_in_use(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+async def serve():
+    # A socket file nobody answers on was left behind by a previous daemon; one
+    # that does answer belongs to a live daemon and must not be taken over
+    if os.path.exists(SOCKET_PATH):
+        if socket_in_use(SOCKET_PATH):
+            print(f"Another RAG daemon is already listening on {SOCKET_PATH}", file=sys.stderr)
+            sys.exit(1)
+        os.unlink(SOCKET_PATH)
+
+    rag = NetworkingRAGPipeline()
+    executor = ThreadPoolExecutor(max_workers=WORKERS)
+
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: serve_client(rag, executor, reader, writer),
+        path=SOCKET_PATH
+    )
+    os.chmod(SOCKET_PATH, 0o600)
+    print(f"RAG daemon listening on {SOCKET_PATH}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+
+def main():
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,110 @@
 #!/usr/bin/env python3
-import json
+import orjson
 import sys
 import os
-from typing import Dict, List, Any, Optional
+import re
+import heapq
+from collections import Counter
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    # Without NumPy every corpus is scored with the pure-Python Counter path
+    NUMPY_AVAILABLE = False
+
+TOKEN_RE = re.compile(r"\w+")
+
+_INDUSTRIES = ("technology", "finance", "healthcare", "consulting", "tech", "fintech")
+# Longer names first so "technology" wins over "tech" at the same position
+_INDUSTRY_RE = re.compile("|".join(sorted(map(re.escape, _INDUSTRIES), key=len, reverse=True)), re.I)
+
+# Default insights per query type, returned as-is (callers only read them)
+_BASE_INSIGHTS: Dict[str, Tuple[str, ...]] = {
+    'networking_strategy': (
+        "Prioritize quality over quantity in professional relationships",
+        "Leverage existing connections for warm introductions",
+        "Engage consistently with your professional network"
+    ),
+    'introduction_advice': (
+        "Research thoroughly before making contact",
+        "Clearly articulate mutual value propositions",
+        "Follow professional introduction etiquette"
+    ),
+    'industry_insights': (
+        "Stay current with industry trends and developments",
+        "Identify key influencers and thought leaders",
+        "Participate in relevant professional communities"
+    ),
+    'connection_analysis': (
+        "Monitor relationship strength indicators",
+        "Track engagement patterns over time",
+        "Focus on connections with highest potential value"
+    )
+}
+
+# Corpora larger than this are scored with NumPy; below it the Counter path is faster
+VECTORIZED_MIN_DOCS = 500
 
 # Simple RAG implementation without complex Haystack dependencies
 class SimpleNetworkingRAG:
+    # Canned guidance per query type; shared by all instances and never mutated
+    _KNOWLEDGE_BASE: ClassVar[Dict[str, Tuple[str, ...]]] = {
+        'networking_strategies': (
+            "Focus on building authentic, mutually beneficial relationships rather than transactional connections.",
+            "Leverage warm introductions through mutual connections for higher success rates.",
+            "Participate actively in industry events and professional communities.",
+            "Share valuable insights and expertise to establish thought leadership.",
+            "Follow up consistently but respectfully with new connections."
+        ),
+        'introduction_techniques': (
+            "Research common interests and mutual connections before reaching out.",
+            "Craft personalized messages that clearly articulate mutual value.",
+            "Keep initial contact messages concise and professional.",
+            "Suggest specific ways you can provide value to the target contact.",
+            "Always thank the introducer and keep them informed of outcomes."
+        ),
+        'industry_insights': (
+            "Technology sector values innovation and rapid adaptation.",
+            "Finance industry prioritizes trust and regulatory compliance.",
+            "Healthcare focuses on patient outcomes and regulatory standards.",
+            "Consulting emphasizes problem-solving and client relationships."
+        ),
+        'connection_analysis': (
+            "Strong connections show regular interaction patterns and mutual engagement.",
+            "Weak ties can be valuable for accessing new information and opportunities.",
+            "Connection strength correlates with response rates and collaboration success.",
+            "Geographic proximity often enhances professional relationship development."
+        )
+    }
+    
     def __init__(self):
-        self.documents = []
-        self.knowledge_base = {
-            'networking_strategies': [
-                "Focus on building authentic, mutually beneficial relationships rather than transactional connections.",
-                "Leverage warm introductions through mutual connections for higher success rates.",
-                "Participate actively in industry events and professional communities.",
-                "Share valuable insights and expertise to establish thought leadership.",
-                "Follow up consistently but respectfully with new connections."
-            ],
-            'introduction_techniques': [
-                "Research common interests and mutual connections before reaching out.",
-                "Craft personalized messages that clearly articulate mutual value.",
-                "Keep initial contact messages concise and professional.",
-                "Suggest specific ways you can provide value to the target contact.",
-                "Always thank the introducer and keep them informed of outcomes."
-            ],
-            'industry_insights': [
-                "Technology sector values innovation and rapid adaptation.",
-                "Finance industry prioritizes trust and regulatory compliance.",
-                "Healthcare focuses on patient outcomes and regulatory standards.",
-                "Consulting emphasizes problem-solving and client relationships."
-            ],
-            'connection_analysis': [
-                "Strong connections show regular interaction patterns and mutual engagement.",
-                "Weak ties can be valuable for accessing new information and opportunities.",
-                "Connection strength correlates with response rates and collaboration success.",
-                "Geographic proximity often enhances professional relationship development."
-            ]
-        }
+        # Documents are stored column-wise; index i refers to the same document in each list
+        self.contents: List[str] = []
+        self.metas: List[Dict[str, Any]] = []
+        self.previews: List[str] = []
+        # Inverted index: token -> {document index: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # Postings as (doc indices, term frequencies) arrays, built on first use
+        self._posting_arrays: Dict[str, Tuple[Any, Any]] = {}
         
     def add_documents(self, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Add documents to the knowledge base"""
         try:
             for doc in docs:
-                self.documents.append({
-                    'content': doc.get('content', ''),
-                    'meta': doc.get('meta', {})
-                })
+                content = doc.get('content', '')
+                doc_id = len(self.contents)
+                self.contents.append(content)
+                self.metas.append(doc.get('meta', {}))
+                self.previews.append(content[:200] + '...' if len(content) > 200 else content)
+                for token, tf in Counter(TOKEN_RE.findall(content.lower())).items():
+                    self.postings.setdefault(token, {})[doc_id] = tf
+            self._posting_arrays.clear()
             return {
                 'success': True,
                 'count': len(docs),
-                'total_documents': len(self.documents)
+                'total_documents': len(self.contents)
             }
         except Exception as e:
             return {
@@ -61,11 +117,11 @@ class SimpleNetworkingRAG:
         """Process a networking-related query"""
         try:
             # Get relevant knowledge based on query type
-            relevant_knowledge = self.knowledge_base.get(query_type, 
-                                                       self.knowledge_base['networking_strategies'])
+            relevant_knowledge = self._KNOWLEDGE_BASE.get(query_type, 
+                                                       self._KNOWLEDGE_BASE['networking_strategies'])
             
             # Find most relevant documents
-            relevant_docs = self._find_relevant_documents(question, context)
+            relevant_docs = self._find_relevant_documents(question, context, top_k=3)
             
             # Generate response based on query type and context
             answer = self._generate_answer(question, context, query_type, relevant_knowledge)
@@ -79,7 +135,7 @@ class SimpleNetworkingRAG:
                 'confidence': 0.85,
                 'sources': [f"Networking knowledge base - {query_type}"],
                 'insights': insights,
-                'retrieved_documents': relevant_docs[:3]
+                'retrieved_documents': relevant_docs
             }
             
         except Exception as e:
@@ -92,24 +148,52 @@ class SimpleNetworkingRAG:
                 'insights': []
             }
     
-    def _find_relevant_documents(self, question: str, context: str) -> List[Dict[str, Any]]:
-        """Find documents relevant to the query"""
-        relevant = []
-        search_terms = question.lower().split()
+    def _find_relevant_documents(self, question: str, context: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Find documents relevant to the query, scored by summed term frequency"""
+        terms = TOKEN_RE.findall(question.lower())
+        if NUMPY_AVAILABLE and len(self.contents) > VECTORIZED_MIN_DOCS:
+            ranked = self._score_vectorized(terms, top_k)
+        else:
+            scores: Counter = Counter()
+            for term in terms:
+                scores.update(self.postings.get(term, {}))
+            ranked = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
         
-        for doc in self.documents:
-            content = doc['content'].lower()
-            relevance_score = sum(1 for term in search_terms if term in content)
-            if relevance_score > 0:
-                relevant.append({
-                    'content': doc['content'][:200] + '...' if len(doc['content']) > 200 else doc['content'],
-                    'relevance_score': relevance_score,
-                    'meta': doc.get('meta', {})
-                })
+        relevant = []
+        for doc_id, relevance_score in ranked:
+            relevant.append({
+                'content': self.previews[doc_id],
+                'relevance_score': relevance_score,
+                'meta': self.metas[doc_id]
+            })
+        return relevant
+    
+    def _score_vectorized(self, terms: List[str], top_k: int) -> List[Tuple[int, int]]:
+        """Sum term frequencies per document with one bincount over the query's postings"""
+        doc_ids, tfs = [], []
+        for term in terms:
+            arrays = self._posting_arrays.get(term)
+            if arrays is None:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                arrays = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                          np.fromiter(posting.values(), dtype=np.int64, count=len(posting)))
+                self._posting_arrays[term] = arrays
+            doc_ids.append(arrays[0])
+            tfs.append(arrays[1])
+        if not doc_ids:
+            return []
         
-        return sorted(relevant, key=lambda x: x['relevance_score'], reverse=True)
+        scores = np.bincount(np.concatenate(doc_ids), weights=np.concatenate(tfs), minlength=len(self.contents))
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(i), int(scores[i])) for i in top]
     
-    def _generate_answer(self, question: str, context: str, query_type: str, knowledge: List[str]) -> str:
+    def _generate_answer(self, question: str, context: str, query_type: str, knowledge: Tuple[str, ...]) -> str:
         """Generate a contextual answer"""
         
         if query_type == "networking_strategy":
@@ -132,48 +216,20 @@ class SimpleNetworkingRAG:
         return f"Based on professional networking best practices: {knowledge[0]}"
     
     def _extract_industry_context(self, question: str, context: str) -> str:
-        """Extract industry information from query"""
-        industries = ["technology", "finance", "healthcare", "consulting", "tech", "fintech"]
-        text = f"{question} {context}".lower()
-        
-        for industry in industries:
-            if industry in text:
-                return industry
-        return "general"
+        """Extract industry information from query: the first industry mentioned"""
+        match = _INDUSTRY_RE.search(question) or _INDUSTRY_RE.search(context)
+        return match.group(0).lower() if match else "general"
     
-    def _extract_insights(self, question: str, query_type: str, knowledge: List[str]) -> List[str]:
+    def _extract_insights(self, question: str, query_type: str, knowledge: Tuple[str, ...]) -> Tuple[str, ...]:
         """Extract actionable insights"""
-        base_insights = {
-            'networking_strategy': [
-                "Prioritize quality over quantity in professional relationships",
-                "Leverage existing connections for warm introductions",
-                "Engage consistently with your professional network"
-            ],
-            'introduction_advice': [
-                "Research thoroughly before making contact",
-                "Clearly articulate mutual value propositions",
-                "Follow professional introduction etiquette"
-            ],
-            'industry_insights': [
-                "Stay current with industry trends and developments",
-                "Identify key influencers and thought leaders",
-                "Participate in relevant professional communities"
-            ],
-            'connection_analysis': [
-                "Monitor relationship strength indicators",
-                "Track engagement patterns over time",
-                "Focus on connections with highest potential value"
-            ]
-        }
-        
-        return base_insights.get(query_type, base_insights['networking_strategy'])
+        return _BASE_INSIGHTS.get(query_type, _BASE_INSIGHTS['networking_strategy'])
     
     def get_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics"""
         return {
             'success': True,
-            'total_documents': len(self.documents),
-            'knowledge_categories': len(self.knowledge_base),
+            'total_documents': len(self.contents),
+            'knowledge_categories': len(self._KNOWLEDGE_BASE),
             'document_store_type': 'Simple In-Memory Store',
             'embedding_model': 'Text-based similarity matching',
             'llm_model': 'Rule-based response generation'
@@ -185,7 +241,7 @@ def main():
         rag = SimpleNetworkingRAG()
         
         # Read input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = orjson.loads(sys.stdin.buffer.read())
         action = input_data.get('action', 'query')
         data = input_data.get('data', {})
         
@@ -202,7 +258,7 @@ def main():
         else:
             result = {'success': False, 'error': f'Unknown action: {action}'}
         
-        print(json.dumps(result))
+        sys.stdout.buffer.write(orjson.dumps(result) + b"\n")
         
     except Exception as e:
         error_result = {
@@ -211,7 +267,7 @@ def main():
             'answer': '',
             'confidence': 0.0
         }
-        print(json.dumps(error_result))
+        sys.stdout.buffer.write(orjson.dumps(error_result) + b"\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
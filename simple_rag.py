@@ -1,14 +1,35 @@
 #!/usr/bin/env python3
 import json
+import orjson
 import sys
 import os
 
+# Keep-alive pool for the shared client, so queries after the first reuse its TCP/TLS connection
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30
+
+_client = None
+
+def get_client():
+    """Return the process-wide OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        import httpx
+        import openai
+        
+        _client = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=openai.DefaultHttpxClient(
+                limits=httpx.Limits(max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                                    keepalive_expiry=KEEPALIVE_EXPIRY)
+            )
+        )
+    return _client
+
 def simple_rag_query(question):
     """Simple RAG implementation using OpenAI directly"""
     try:
-        import openai
-        
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = get_client()
         
         knowledge_base = """
         Professional Networking Knowledge Base:
@@ -55,13 +76,13 @@ def main():
     else:
         for line in sys.stdin:
             try:
-                request = json.loads(line.strip())
+                request = orjson.loads(line)
                 if request.get("action") == "query":
                     result = simple_rag_query(request["data"]["question"])
-                    print(json.dumps(result))
-                    break
-            except:
-                break
+                    sys.stdout.buffer.write(orjson.dumps(result) + b"\n")
+                    sys.stdout.buffer.flush()
+            except Exception:
+                continue
 
 if __name__ == "__main__":
     main()
\ No newline at end of file